@@ -8,7 +8,7 @@ Dependencies:
 - google-auth
 - google-auth-oauthlib
 - google-api-python-client
-- requests
+- aiohttp
 - python-dotenv
 - Pillow
 
@@ -18,22 +18,44 @@ Date: May 20, 2025
 
 import os
 import io
-import base64
+import re
 import time
+import atexit
+import queue
 import argparse
+import asyncio
+import hashlib
 import logging
-import requests
+import aiohttp
+import httplib2
+import google_auth_httplib2
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from itertools import zip_longest
 from dotenv import load_dotenv
 from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseUpload
+from googleapiclient.http import HttpRequest, MediaInMemoryUpload, MediaIoBaseUpload
+from PIL import Image
 from typing import List, Dict, Any, Optional
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+# Configure logging through a queue: records are handed off to a background
+# listener thread, so stream I/O never blocks the worker coroutines
+from logging.handlers import QueueHandler, QueueListener
+
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+_queue_handler = QueueHandler(_log_queue)
+# QueueHandler.prepare() formats each record before it is queued, so the
+# format lives here and the listener's StreamHandler stays bare — giving it
+# a formatter too would format every line twice
+_queue_handler.setFormatter(
+    logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 )
+logging.basicConfig(level=logging.INFO, handlers=[_queue_handler])
+_log_listener = QueueListener(_log_queue, logging.StreamHandler())
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
 logger = logging.getLogger(__name__)
 
 # Set up scopes for Google Sheets and Drive API
@@ -42,12 +64,138 @@ SCOPES = [
     'https://www.googleapis.com/auth/drive'
 ]
 
+# Shared HTTP session (created in process_poses) so TCP/TLS connections are
+# reused across calls and poses instead of a fresh handshake per request
+SESSION: Optional[aiohttp.ClientSession] = None
+
+# Number of generation requests raced per pose (set from --race-n in main)
+RACE_N = 1
+
+# Collapses any run of whitespace in a crafted prompt to a single space
+_WS_RE = re.compile(r'\s+')
+
+# On-disk cache of generated images so re-runs skip the API entirely
+IMAGE_CACHE_DIR = '.image_cache'
+
+# In-process cache keyed by (prompt, api); entries hold the generation task
+# itself so rows with identical prompts share a single in-flight API call
+_image_cache: Dict[tuple, asyncio.Task] = {}
+
+def _image_cache_path(prompt: str, api: str) -> str:
+    """Return the disk cache path for a (prompt, api) pair."""
+    digest = hashlib.sha256(f'{api}:{prompt}'.encode()).hexdigest()
+    return os.path.join(IMAGE_CACHE_DIR, f'{digest}.png')
+
+# Only idempotent methods are retried automatically; re-sending a POST whose
+# connection dropped after the server accepted it would enqueue a duplicate
+# (paid) generation job
+_RETRIABLE_METHODS = frozenset({'GET', 'HEAD'})
+
+async def _request(method: str, url: str, **kwargs) -> aiohttp.ClientResponse:
+    """
+    Issue an HTTP request through the shared session. Idempotent requests
+    are retried on 5xx responses and network errors with exponential
+    backoff; other methods get a single attempt.
+
+    Args:
+        method: HTTP method ('GET', 'POST', ...)
+        url: Request URL
+        **kwargs: Extra arguments passed to the session request
+
+    Returns:
+        The aiohttp response (not yet consumed)
+    """
+    max_retries = 3 if method in _RETRIABLE_METHODS else 0
+    last_exc = None
+    for attempt in range(max_retries + 1):
+        if attempt:
+            await asyncio.sleep(0.3 * (2 ** (attempt - 1)))
+        try:
+            response = await SESSION.request(method, url, **kwargs)
+            if response.status < 500:
+                return response
+            last_exc = aiohttp.ClientResponseError(
+                response.request_info,
+                response.history,
+                status=response.status,
+                message=response.reason or ''
+            )
+            response.release()
+        except aiohttp.ClientError as e:
+            last_exc = e
+    raise last_exc
+
+async def _download_image(url: str) -> Optional[bytes]:
+    """
+    Download an image into a buffer preallocated from Content-Length,
+    avoiding incremental reallocation while the body streams in.
+
+    Args:
+        url: Image URL
+
+    Returns:
+        Image data as bytes, or None on a non-200 response
+    """
+    async with await _request("GET", url) as response:
+        if response.status != 200:
+            return None
+
+        size = int(response.headers.get('Content-Length', 0))
+        if not size:
+            return await response.read()
+
+        buf = bytearray(size)
+        view = memoryview(buf)
+        offset = 0
+        async for chunk in response.content.iter_chunked(65536):
+            view[offset:offset + len(chunk)] = chunk
+            offset += len(chunk)
+        return bytes(buf)
+
+def _build_service(name: str, version: str, credentials: Credentials) -> Any:
+    """
+    Build a Google API service whose requests are safe to execute from
+    concurrent threads.
+
+    googleapiclient services are not thread-safe: the default request
+    builder routes every .execute() through the one httplib2.Http the
+    service was built with. Giving each request its own AuthorizedHttp
+    keeps concurrent calls from executor threads from sharing a
+    connection.
+
+    Args:
+        name: API name (e.g. 'drive')
+        version: API version (e.g. 'v3')
+        credentials: Google API credentials
+
+    Returns:
+        The service object
+    """
+    def build_request(http, *args, **kwargs):
+        new_http = google_auth_httplib2.AuthorizedHttp(
+            credentials, http=httplib2.Http()
+        )
+        return HttpRequest(new_http, *args, **kwargs)
+
+    return build(
+        name,
+        version,
+        http=google_auth_httplib2.AuthorizedHttp(credentials, http=httplib2.Http()),
+        requestBuilder=build_request,
+        cache_discovery=False
+    )
+
 def parse_arguments():
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(description='Generate AI images for yoga poses and insert them into Google Sheets')
     parser.add_argument('--sheet_id', type=str, help='Google Sheet ID')
     parser.add_argument('--api', type=str, default='ideogram', choices=['openai', 'ideogram', 'stability'],
                         help='AI image generation API to use (default: ideogram)')
+    parser.add_argument('--concurrency', type=int, default=5,
+                        help='Maximum number of poses processed in parallel (default: 5)')
+    parser.add_argument('--race-n', type=int, default=1,
+                        help='Number of generation requests raced per pose; the first '
+                             'success wins and the rest are cancelled (default: 1)')
     return parser.parse_args()
 
 def authenticate_google() -> Credentials:
@@ -74,24 +222,27 @@ def authenticate_google() -> Credentials:
         logger.error(f"Error authenticating with service account: {e}")
         raise
 
-def get_sheet_data(sheet_id: str, credentials: Credentials) -> List[Dict[str, Any]]:
+def get_sheet_data(sheet_id: str, service: Any) -> List[Dict[str, Any]]:
     """
     Retrieve yoga pose data from the specified Google Sheet.
-    
+
     Args:
         sheet_id: ID of the Google Sheet
-        credentials: Google API credentials
-    
+        service: Prebuilt Sheets API service
+
     Returns:
         List of dictionaries containing yoga pose data
     """
-    service = build('sheets', 'v4', credentials=credentials)
     sheet = service.spreadsheets()
     
-    # Get sheet data
+    # Get sheet data; the fields mask drops response metadata we discard and
+    # unformatted values skip server-side formatting work
     result = sheet.values().get(
         spreadsheetId=sheet_id,
-        range='Sheet1!A1:E'  # Adjust range as needed
+        range='Sheet1!A1:E',  # Adjust range as needed
+        fields='values',
+        valueRenderOption='UNFORMATTED_VALUE',
+        majorDimension='ROWS'
     ).execute()
     
     values = result.get('values', [])
@@ -99,47 +250,48 @@ def get_sheet_data(sheet_id: str, credentials: Credentials) -> List[Dict[str, An
         logger.error('No data found in sheet')
         return []
     
-    # Convert to list of dictionaries
+    # Convert to list of dictionaries; zip_longest pads short rows in place
+    # of building an extended copy of every row
     headers = values[0]
-    data = []
-    for row in values[1:]:
-        # Ensure row has enough elements
-        row_extended = row + [''] * (len(headers) - len(row))
-        data.append(dict(zip(headers, row_extended)))
-    
-    return data
+    return [
+        dict(zip_longest(headers, row[:len(headers)], fillvalue=''))
+        for row in values[1:]
+    ]
+
+@lru_cache(maxsize=256)
+def _build_prompt(style: str, bg_color: str, theme: str, pose: str) -> str:
+    """Combine the pose fields into a cleaned-up prompt string."""
+    prompt = f"{style} {pose} yoga pose, {bg_color} background. {theme}"
+    return _WS_RE.sub(' ', prompt.replace('None', '')).strip()
 
 def craft_prompt(pose_data: Dict[str, Any]) -> str:
     """
     Create an optimized prompt for AI image generation based on yoga pose data.
-    
+
     Args:
         pose_data: Dictionary containing yoga pose data
-    
+
     Returns:
         Optimized prompt string
     """
-    style = pose_data.get('Image Style', '')
-    bg_color = pose_data.get('Background Color', '')
-    theme = pose_data.get('Theme Description', '')
     pose = pose_data.get('Content Title', '')
-    
-    # Create a detailed prompt that combines all elements
-    prompt = f"{style} {pose} yoga pose, {bg_color} background. {theme}"
-    
-    # Clean up the prompt
-    prompt = prompt.replace('None', '').replace('  ', ' ').strip()
-    
+    prompt = _build_prompt(
+        pose_data.get('Image Style', ''),
+        pose_data.get('Background Color', ''),
+        pose_data.get('Theme Description', ''),
+        pose
+    )
+
     logger.info(f"Generated prompt for {pose}: {prompt}")
     return prompt
 
-def generate_image_openai(prompt: str) -> Optional[bytes]:
+async def generate_image_openai(prompt: str) -> Optional[bytes]:
     """
     Generate an image using OpenAI's DALL-E API.
-    
+
     Args:
         prompt: Image generation prompt
-    
+
     Returns:
         Image data as bytes if successful, None otherwise
     """
@@ -147,44 +299,48 @@ def generate_image_openai(prompt: str) -> Optional[bytes]:
     if not api_key:
         logger.error("OpenAI API key not found in environment variables")
         return None
-    
+
     headers = {
         "Content-Type": "application/json",
         "Authorization": f"Bearer {api_key}"
     }
-    
+
     payload = {
         "model": "dall-e-3",
         "prompt": prompt,
         "n": 1,
         "size": "1024x1024",
-        "response_format": "b64_json"
+        "response_format": "url"
     }
-    
+
     try:
-        response = requests.post(
+        async with await _request(
+            "POST",
             "https://api.openai.com/v1/images/generations",
             headers=headers,
             json=payload
-        )
-        response.raise_for_status()
-        
-        # Extract base64 image data
-        result = response.json()
-        image_data = result["data"][0]["b64_json"]
-        return base64.b64decode(image_data)
-    
+        ) as response:
+            response.raise_for_status()
+            result = await response.json()
+
+        # Download the raw image; the extra GET reuses a pooled connection
+        # and avoids the ~33% inflation plus decode of a b64_json response
+        image_url = result["data"][0]["url"]
+        async with await _request("GET", image_url) as img_response:
+            img_response.raise_for_status()
+            return await img_response.read()
+
     except Exception as e:
         logger.error(f"Error generating image with OpenAI: {e}")
         return None
 
-def generate_image_ideogram(prompt: str) -> Optional[bytes]:
+async def generate_image_ideogram(prompt: str) -> Optional[bytes]:
     """
     Generate an image using Ideogram API.
-    
+
     Args:
         prompt: Image generation prompt
-    
+
     Returns:
         Image data as bytes if successful, None otherwise
     """
@@ -192,64 +348,90 @@ def generate_image_ideogram(prompt: str) -> Optional[bytes]:
     if not api_key:
         logger.error("Ideogram API key not found in environment variables")
         return None
-    
+
     headers = {
         "Content-Type": "application/json",
         "Authorization": f"Bearer {api_key}"
     }
-    
+
     payload = {
         "prompt": prompt,
         "style": "illustration",  # Appropriate for yoga pose illustrations
         "aspect_ratio": "1:1"
     }
-    
+
     try:
         # Generate the image
-        response = requests.post(
+        async with await _request(
+            "POST",
             "https://api.ideogram.ai/api/v1/generation",
             headers=headers,
             json=payload
-        )
-        response.raise_for_status()
-        
+        ) as response:
+            response.raise_for_status()
+            result = await response.json()
+
         # Get generation ID
-        result = response.json()
         generation_id = result.get("generation_id")
-        
+
         if not generation_id:
             logger.error("No generation ID returned from Ideogram API")
             return None
-        
-        # Poll for result
-        max_attempts = 30
-        for attempt in range(max_attempts):
-            time.sleep(2)  # Wait before checking
-            
-            status_response = requests.get(
-                f"https://api.ideogram.ai/api/v1/generation/{generation_id}",
-                headers=headers
-            )
-            status_response.raise_for_status()
-            
-            status_data = status_response.json()
-            if status_data.get("state") == "completed":
-                # Download the image
-                image_url = status_data.get("image_url")
-                if image_url:
-                    img_response = requests.get(image_url)
-                    if img_response.status_code == 200:
-                        return img_response.content
-                break
-        
+
+        status_url = f"https://api.ideogram.ai/api/v1/generation/{generation_id}"
+
+        # Long-poll first: ask the server to hold the request until the job
+        # finishes. When honored, this replaces the whole polling loop with a
+        # single round-trip; a server that ignores the wait parameter just
+        # answers immediately and we fall back to backoff polling below.
+        try:
+            async with await _request(
+                "GET", status_url, headers=headers, params={"wait": 30}
+            ) as status_response:
+                status_response.raise_for_status()
+                status_data = await status_response.json()
+        except aiohttp.ClientError as e:
+            logger.warning(f"Ideogram long-poll failed, falling back to polling: {e}")
+            status_data = {}
+
+        # Poll for result with exponential backoff: fast jobs return after a
+        # short wait, slow jobs settle at a 3 s cadence, within a 60 s budget
+        delay = 0.3
+        start = time.monotonic()
+        while status_data.get("state") != "completed" and time.monotonic() - start < 60:
+            await asyncio.sleep(delay)
+
+            try:
+                async with await _request(
+                    "GET", status_url, headers=headers
+                ) as status_response:
+                    status_response.raise_for_status()
+                    status_data = await status_response.json()
+            except aiohttp.ClientError as e:
+                # Double the delay on failure; the cap below restores the
+                # normal schedule once polling succeeds again
+                logger.warning(f"Ideogram status poll failed, backing off: {e}")
+                delay = min(delay * 2, 60.0)
+                continue
+
+            delay = min(delay * 1.25, 3.0)
+
+        if status_data.get("state") == "completed":
+            # Download the image
+            image_url = status_data.get("image_url")
+            if image_url:
+                image_data = await _download_image(image_url)
+                if image_data is not None:
+                    return image_data
+
         logger.error("Image generation timed out or failed")
         return None
-    
+
     except Exception as e:
         logger.error(f"Error generating image with Ideogram: {e}")
         return None
 
-def generate_image_stability(prompt: str) -> Optional[bytes]:
+async def generate_image_stability(prompt: str) -> Optional[bytes]:
     """
     Generate an image using Stability AI API.
     
@@ -266,9 +448,10 @@ def generate_image_stability(prompt: str) -> Optional[bytes]:
     
     headers = {
         "Content-Type": "application/json",
+        "Accept": "image/png",  # raw bytes instead of base64-in-JSON
         "Authorization": f"Bearer {api_key}"
     }
-    
+
     payload = {
         "text_prompts": [
             {
@@ -284,72 +467,149 @@ def generate_image_stability(prompt: str) -> Optional[bytes]:
     }
     
     try:
-        response = requests.post(
+        async with await _request(
+            "POST",
             "https://api.stability.ai/v1/generation/stable-diffusion-xl-1024-v1-0/text-to-image",
             headers=headers,
             json=payload
-        )
-        response.raise_for_status()
-        
-        result = response.json()
-        if "artifacts" in result and len(result["artifacts"]) > 0:
-            image_data = result["artifacts"][0]["base64"]
-            return base64.b64decode(image_data)
-        
-        logger.error("No image artifacts returned from Stability API")
-        return None
-    
+        ) as response:
+            response.raise_for_status()
+            return await response.read()
+
     except Exception as e:
         logger.error(f"Error generating image with Stability AI: {e}")
         return None
 
-def generate_image(prompt: str, api: str) -> Optional[bytes]:
+# Supported generation APIs; the --api choice is resolved to a callable once
+# in main() rather than re-dispatching per pose
+API_GENERATORS = {
+    'openai': generate_image_openai,
+    'ideogram': generate_image_ideogram,
+    'stability': generate_image_stability
+}
+
+async def _race_generation(gen_fn, prompt: str) -> Optional[bytes]:
     """
-    Generate an image using the specified API.
-    
+    Fire several identical generation requests and return the first
+    successful result, cancelling the rest. Racing hides queueing delay on
+    APIs where any single request may sit in a slow queue.
+    """
+    tasks = [asyncio.ensure_future(gen_fn(prompt)) for _ in range(RACE_N)]
+    try:
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                image_data = task.result()
+                if image_data:
+                    return image_data
+        return None
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+async def _generate_image_uncached(prompt: str, api: str, gen_fn) -> Optional[bytes]:
+    """Check the disk cache, then fall back to the generation API."""
+    path = _image_cache_path(prompt, api)
+    if os.path.exists(path):
+        logger.info(f"Image cache hit for prompt: {prompt}")
+        with open(path, 'rb') as f:
+            return f.read()
+
+    if RACE_N > 1:
+        image_data = await _race_generation(gen_fn, prompt)
+    else:
+        image_data = await gen_fn(prompt)
+    if image_data:
+        os.makedirs(IMAGE_CACHE_DIR, exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(image_data)
+    return image_data
+
+async def generate_image(prompt: str, api: str, gen_fn) -> Optional[bytes]:
+    """
+    Generate an image using the given generator, memoized on (prompt, api).
+
+    Rows with identical prompts share a single API call, and results are
+    persisted to disk so re-runs skip generation entirely.
+
     Args:
         prompt: Image generation prompt
-        api: Name of the API to use ('openai', 'ideogram', or 'stability')
-    
+        api: Name of the API in use (cache key component)
+        gen_fn: Generator coroutine resolved from API_GENERATORS
+
     Returns:
         Image data as bytes if successful, None otherwise
     """
-    api_functions = {
-        'openai': generate_image_openai,
-        'ideogram': generate_image_ideogram,
-        'stability': generate_image_stability
-    }
-    
-    if api not in api_functions:
-        logger.error(f"Unsupported API: {api}")
-        return None
-    
-    return api_functions[api](prompt)
+    key = (prompt, api)
+    task = _image_cache.get(key)
+    if task is None:
+        task = asyncio.ensure_future(
+            _generate_image_uncached(prompt, api, gen_fn)
+        )
+        _image_cache[key] = task
+
+    image_data = await task
+    if image_data is None:
+        # Don't cache failures; a duplicate row should get a fresh attempt
+        _image_cache.pop(key, None)
+    return image_data
 
-def upload_image_to_drive(image_data: bytes, filename: str, credentials: Credentials) -> str:
+def _resize_and_encode(image_data: bytes) -> bytes:
+    """
+    Downscale a generated image to at most 512 px and re-encode it as WebP.
+
+    Sheets renders IMAGE() cells well below 1024 px, so a 512 px WebP at
+    quality 85 is visually identical while uploading 5-10x fewer bytes.
+
+    Args:
+        image_data: Original image binary data
+
+    Returns:
+        Resized WebP image data
+    """
+    img = Image.open(io.BytesIO(image_data))
+    img.thumbnail((512, 512), Image.LANCZOS)
+    buf = io.BytesIO()
+    img.save(buf, 'WEBP', quality=85)
+    return buf.getvalue()
+
+def upload_image_to_drive(image_data: bytes, filename: str, service: Any) -> str:
     """
     Upload an image to Google Drive and return its URL.
-    
+
     Args:
         image_data: Image binary data
         filename: Name for the image file
-        credentials: Google API credentials
-    
+        service: Prebuilt Drive API service
+
     Returns:
         URL of the uploaded image in a format suitable for Google Sheets IMAGE() formula
     """
-    service = build('drive', 'v3', credentials=credentials)
-    
     file_metadata = {
         'name': filename,
-        'mimeType': 'image/png'
+        'mimeType': 'image/webp'
     }
-    
-    media = MediaIoBaseUpload(
-        io.BytesIO(image_data),
-        mimetype='image/png',
-        resumable=True
-    )
+
+    # Uploading into a pre-shared public folder lets the file inherit the
+    # folder's permissions, saving a separate permissions.create call per image
+    folder_id = os.getenv('DRIVE_FOLDER_ID')
+    if folder_id:
+        file_metadata['parents'] = [folder_id]
+    
+    # Upload small images in a single non-resumable request; resumable upload
+    # costs an extra initiation round-trip and only pays off for large files
+    if len(image_data) > 5_000_000:
+        media = MediaIoBaseUpload(
+            io.BytesIO(image_data),
+            mimetype='image/webp',
+            resumable=True
+        )
+    else:
+        media = MediaInMemoryUpload(image_data, mimetype='image/webp')
     
     file = service.files().create(
         body=file_metadata,
@@ -357,12 +617,13 @@ def upload_image_to_drive(image_data: bytes, filename: str, credentials: Credent
         fields='id,webContentLink'  # Request webContentLink instead of webViewLink
     ).execute()
     
-    # Set file to be publicly viewable
-    service.permissions().create(
-        fileId=file.get('id'),
-        body={'type': 'anyone', 'role': 'reader'},
-        fields='id'
-    ).execute()
+    # Set file to be publicly viewable (inherited from the folder if one is set)
+    if not folder_id:
+        service.permissions().create(
+            fileId=file.get('id'),
+            body={'type': 'anyone', 'role': 'reader'},
+            fields='id'
+        ).execute()
     
     # Get the direct download link and clean it up for IMAGE formula
     download_link = file.get('webContentLink', '')
@@ -370,93 +631,182 @@ def upload_image_to_drive(image_data: bytes, filename: str, credentials: Credent
     # If we got a webContentLink, clean it up
     # Remove the "download" query parameter to make it work as a direct image URL
     download_link = download_link.replace('&export=download', '')
-    print("IF STATEMENT",download_link)
 
     logger.info(f"Created image URL: {download_link}")
     
     return download_link
 
-def update_sheet_with_image(sheet_id: str, row: int, image_url: str, credentials: Credentials) -> None:
+def update_sheet_with_images(sheet_id: str, updates: List[tuple], service: Any) -> None:
     """
-    Update a cell in the Google Sheet with an image formula.
-    
+    Write image formulas for all processed poses in batched API calls.
+
     Args:
         sheet_id: ID of the Google Sheet
-        row: Row number (1-based) to update
-        image_url: URL of the image to insert
-        credentials: Google API credentials
+        updates: List of (row, image_url) pairs with 1-based row numbers
+        service: Prebuilt Sheets API service
     """
-    service = build('sheets', 'v4', credentials=credentials)
-    
-    # Create IMAGE formula
-    formula = f'=IMAGE("{image_url}", 3)'
-    
-    # Update the cell in column E
-    range_name = f'Sheet1!E{row+1}'  # +1 because rows are 1-indexed in sheets
-    
-    body = {
-        'values': [[formula]]
-    }
-    
-    service.spreadsheets().values().update(
-        spreadsheetId=sheet_id,
-        range=range_name,
-        valueInputOption='USER_ENTERED',
-        body=body
-    ).execute()
-    
-    logger.info(f"Updated cell {range_name} with image")
+    if not updates:
+        return
+
+    # Create IMAGE formulas for the cells in column E
+    data = [
+        {
+            'range': f'Sheet1!E{row+1}',  # +1 because rows are 1-indexed in sheets
+            'values': [[f'=IMAGE("{image_url}", 3)']]
+        }
+        for row, image_url in updates
+    ]
+
+    # One round-trip per 100 cells instead of one per pose
+    for start in range(0, len(data), 100):
+        service.spreadsheets().values().batchUpdate(
+            spreadsheetId=sheet_id,
+            body={
+                'valueInputOption': 'USER_ENTERED',
+                'data': data[start:start+100]
+            }
+        ).execute()
+
+    logger.info(f"Updated {len(updates)} cells with images")
+
+async def process_pose(i: int, pose_data: Dict[str, Any], total: int,
+                       api: str, gen_fn, drive_svc: Any, updates: List[tuple],
+                       semaphore: asyncio.Semaphore,
+                       pool: ProcessPoolExecutor,
+                       io_pool: ThreadPoolExecutor) -> None:
+    """
+    Generate and upload the image for a single pose, recording the sheet
+    update to be applied in one batch once all poses are done.
+
+    Args:
+        i: Zero-based index of the pose in the sheet data
+        pose_data: Dictionary containing yoga pose data
+        total: Total number of poses being processed
+        api: Name of the image generation API in use
+        gen_fn: Generator coroutine resolved from API_GENERATORS
+        drive_svc: Prebuilt Drive API service
+        updates: Shared list collecting (row, image_url) pairs
+        semaphore: Semaphore bounding the number of poses in flight
+        pool: Process pool for CPU-bound image encoding
+        io_pool: Thread pool for blocking Google client calls
+    """
+    pose_name = pose_data.get('Content Title', '')
+    if not pose_name:
+        return
+
+    async with semaphore:
+        logger.info(f"Processing pose {i+1}/{total}: {pose_name}")
+
+        try:
+            # Create prompt for image generation
+            prompt = craft_prompt(pose_data)
+
+            # Generate image
+            logger.info(f"Generating image for {pose_name}...")
+            image_data = await generate_image(prompt, api, gen_fn)
+
+            if image_data:
+                loop = asyncio.get_running_loop()
+
+                # Downscale and re-encode before upload to cut transfer size;
+                # Lanczos is CPU-bound, so run it in a worker process rather
+                # than blocking the event loop
+                image_data = await loop.run_in_executor(pool, _resize_and_encode, image_data)
+
+                # Upload image to Google Drive (blocking client, run in executor)
+                filename = f"yoga_{pose_name.lower().replace(' ', '_')}.webp"
+                image_url = await loop.run_in_executor(
+                    io_pool, upload_image_to_drive, image_data, filename, drive_svc
+                )
+
+                # Record the sheet update; all cells are written in one batch later
+                updates.append((i+1, image_url))
+
+                logger.info(f"Successfully processed {pose_name}")
+            else:
+                logger.error(f"Failed to generate image for {pose_name}")
+        except Exception as e:
+            # One failed pose shouldn't take down its siblings or prevent
+            # the completed ones from being written to the sheet
+            logger.error(f"Error processing {pose_name}: {e}")
+
+async def process_poses(yoga_poses: List[Dict[str, Any]], sheet_id: str, api: str,
+                        sheets_svc: Any, drive_svc: Any, concurrency: int) -> None:
+    """
+    Process all poses concurrently, bounded by a semaphore.
+
+    Args:
+        yoga_poses: List of dictionaries containing yoga pose data
+        sheet_id: ID of the Google Sheet
+        api: Name of the image generation API to use
+        sheets_svc: Prebuilt Sheets API service
+        drive_svc: Prebuilt Drive API service
+        concurrency: Maximum number of poses processed in parallel
+    """
+    global SESSION
+    SESSION = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=50)
+    )
+    pool = ProcessPoolExecutor(max_workers=os.cpu_count())
+    # Blocking googleapiclient calls run on a small dedicated thread pool so
+    # they never stall the event loop; running them concurrently is safe only
+    # because _build_service gives every request its own AuthorizedHttp
+    io_pool = ThreadPoolExecutor(max_workers=8)
+    semaphore = asyncio.Semaphore(concurrency)
+    updates: List[tuple] = []
+    try:
+        gen_fn = API_GENERATORS[api]
+        await asyncio.gather(*[
+            process_pose(i, pose_data, len(yoga_poses), api, gen_fn,
+                         drive_svc, updates, semaphore, pool, io_pool)
+            for i, pose_data in enumerate(yoga_poses)
+        ])
+    finally:
+        try:
+            # Write all collected image formulas to the sheet in one batch,
+            # even if some poses failed along the way
+            await asyncio.get_running_loop().run_in_executor(
+                io_pool, update_sheet_with_images, sheet_id, updates, sheets_svc
+            )
+        finally:
+            pool.shutdown()
+            io_pool.shutdown()
+            await SESSION.close()
+            SESSION = None
 
 def main():
     """Main execution function."""
+    global RACE_N
+
     args = parse_arguments()
-    
+    RACE_N = max(1, args.race_n)
+
     # Load environment variables from .env file
     load_dotenv()
-    
+
     # Get Google Sheet ID from arguments or prompt
     sheet_id = args.sheet_id
     if not sheet_id:
         sheet_id = input("Enter Google Sheet ID: ")
-    
+
     # Choose API
     api = args.api
     print(f"Using {api.upper()} API for image generation")
-    
-    # Authenticate with Google
+
+    # Authenticate with Google and build the API clients once; the client
+    # library ships static discovery documents, so no network fetch happens
     credentials = authenticate_google()
-    
+    sheets_svc = _build_service('sheets', 'v4', credentials)
+    drive_svc = _build_service('drive', 'v3', credentials)
+
     # Get data from sheet
-    yoga_poses = get_sheet_data(sheet_id, credentials)
+    yoga_poses = get_sheet_data(sheet_id, sheets_svc)
     logger.info(f"Retrieved {len(yoga_poses)} yoga poses from sheet")
-    
-    # Process each pose
-    for i, pose_data in enumerate(yoga_poses):
-        pose_name = pose_data.get('Content Title', '')
-        if not pose_name:
-            continue
-        
-        logger.info(f"Processing pose {i+1}/{len(yoga_poses)}: {pose_name}")
-        
-        # Create prompt for image generation
-        prompt = craft_prompt(pose_data)
-        
-        # Generate image
-        logger.info(f"Generating image for {pose_name}...")
-        image_data = generate_image(prompt, api)
-        
-        if image_data:
-            # Upload image to Google Drive
-            filename = f"yoga_{pose_name.lower().replace(' ', '_')}.png"
-            image_url = upload_image_to_drive(image_data, filename, credentials)
-            
-            # Update sheet with image
-            update_sheet_with_image(sheet_id, i+1, image_url, credentials)
-            
-            logger.info(f"Successfully processed {pose_name}")
-        else:
-            logger.error(f"Failed to generate image for {pose_name}")
-    
+
+    # Process poses concurrently
+    asyncio.run(process_poses(yoga_poses, sheet_id, api, sheets_svc, drive_svc,
+                              args.concurrency))
+
     logger.info("Process completed!")
 
 if __name__ == "__main__":